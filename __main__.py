@@ -2,10 +2,15 @@
 objects for fast spatial querying.
 """
 #%% standard library imports
+from concurrent.futures import ThreadPoolExecutor
+import struct
 import pandas as pd
-from dateutil.parser import isoparse
 
 #%% third party imports
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
 import sqlalchemy as sal
 from sqlalchemy import create_engine
 
@@ -14,6 +19,36 @@ atlantic_path = "resources//hurdat2-1851-2019-052520.txt"
 pacific_path = "resources//hurdat2-nepac-1949-2019-042320.txt"
 sqlserver = "sqlserver"
 database = "databasename"
+# optional csv file the sql server can read, like a file share, to BULK INSERT the points table from. when left as None
+# the points are sent through pandas to_sql instead.
+bulk_insert_file = None
+
+#%% columns of the hurdat2 text files. header rows only fill the first three with the event id, name, and
+# number of data points.
+file_columns = [
+    "date",
+    "time",
+    "identifier",
+    "status",
+    "latitude",
+    "longitude",
+    "max_wind_knots",  # maximum sustained wind (knots)
+    "min_pressure_mb",  # minimum central pressure
+    "ne_34kt_radii_max_nm",  # 34 kt wind radii max extent in N-E quadrant in nautical miles
+    "se_34kt_radii_max_nm",  # 34 kt wind radii max extent in S-E quadrant in nautical miles
+    "sw_34kt_radii_max_nm",  # 34 kt wind radii max extent in S-W quadrant in nautical miles
+    "nw_34kt_radii_max_nm",  # 34 kt wind radii max extent in N-W quadrant in nautical miles
+    "ne_50kt_radii_max_nm",  # 50 kt wind radii max extent in N-E quadrant in nautical miles
+    "se_50kt_radii_max_nm",  # 50 kt wind radii max extent in S-E quadrant in nautical miles
+    "sw_50kt_radii_max_nm",  # 50 kt wind radii max extent in S-W quadrant in nautical miles
+    "nw_50kt_radii_max_nm",  # 50 kt wind radii max extent in N-W quadrant in nautical miles
+    "ne_64kt_radii_max_nm",  # 64 kt wind radii max extent in N-E quadrant in nautical miles
+    "se_64kt_radii_max_nm",  # 64 kt wind radii max extent in S-E quadrant in nautical miles
+    "sw_64kt_radii_max_nm",  # 64 kt wind radii max extent in S-W quadrant in nautical miles
+    "nw_64kt_radii_max_nm"  # 64 kt wind radii max extent in N-W quadrant in nautical miles
+]
+
+radii_columns = [column for column in file_columns if column.endswith("_nm")]
 
 #%% dictionaries to code the identifier and status columns
 record_identifier = {
@@ -46,175 +81,239 @@ status = {
     "PT": pd.NA  # invalid value found in pacific dataset
 }
 
+#%% lookup tables of the identifier and status codes loaded into sql server
+record_table = pd.DataFrame({
+    "description": [
+        "closest approach to a coast, not followed by a landfall",
+        "genesis",
+        "an intensity peak in terms of both pressure and wind",
+        "landfall",
+        "minimum central pressure",
+        "additional detail on intensity of cyclone when rapid changes are underway",
+        "change in status of the system",
+        "provides additional detail on the track (position) of the cyclone",
+        "maximum sustained wind speed"
+    ],
+    "record_id": np.arange(9, dtype="int8")
+})
+
+status_table = pd.DataFrame({
+    "description": [
+        "tropical cyclone of tropical depression intensity (<34 knots)",
+        "tropical cyclone of tropical storm intensity (34-63 knots)",
+        "tropical cyclone of hurricane intensity (>= 64 knots)",
+        "extratropical cyclone of any intensity",
+        "subtropical cyclone of subtropical depression intensity (<34 knots)",
+        "subtropical cyclone of subtropical storm intensity (>= 34 knots)",
+        "low that is neither a tropical cyclone, a subtropical cyclone, nor an extratropical cyclone",
+        "a tropical wave",
+        "disturbance of any intensity"
+    ],
+    "status_id": np.arange(9, dtype="int8")
+})
+
+
+#%% pandas dtypes for the arrow columns read from the hurdat2 files
+arrow_types = {
+    pa.string(): pd.ArrowDtype(pa.string()),
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype()
+}
+
+
+def code_dtype(codes):
+    """ Categorical dtype of the codes in one of the coding dictionaries that map to a value."""
+    return pd.CategoricalDtype([code for code, value in codes.items() if value is not pd.NA])
+
+
+def field(rows, index):
+    """ Pulls one field out of the split rows of a hurdat2 text file."""
+    return pc.utf8_trim_whitespace(pc.list_element(rows, index))
+
+
+def coordinate(column, negative_hemisphere):
+    """ Converts a column of hurdat2 coordinates like 94.8W into signed float32 degrees."""
+    magnitude = pc.cast(pc.utf8_slice_codeunits(column, 0, -1), pa.float32())
+    is_negative = pc.equal(pc.utf8_slice_codeunits(column, -1), negative_hemisphere)
+    return pc.if_else(is_negative, pc.negate(magnitude), magnitude)
+
 
 def process_file(file_path):
     """ Code for processing the hurdat2 text files."""
-    file_headers = []
-    file_data = []
-    file = open(file_path, 'r')
-    for row in file:
-        row_split = row.split(",")
-        if len(row_split) == 4:
-            # header row
-            file_headers.append([
-                row_split[0],  # event id
-                row_split[0][0:2],  # basin
-                row_split[0][2:4],  # storm number
-                row_split[0][4:8],  # year
-                row_split[1].lstrip(" "),  # name
-                int(row_split[2])  # number of data points
-            ])
-        else:
-            # data row
-            file_data.append([
-                file_headers[-1][0],  # event id. Need this to link back to header table.
-                row_split[0][0:4],  # year
-                row_split[0][4:6],  # month
-                row_split[0][6:8],  # day
-                row_split[1].lstrip(" ")[0:2],  # hours in UTC
-                row_split[1][-2:],  # minutes in UTC
-                row_split[2][-1],  # record identifier
-                row_split[3][-2:],  # storm status code
-                float(row_split[4][:-1]) * (-1 if row_split[4][-1] == "S" else 1),  # Latitude
-                float(row_split[5][:-1]) * (-1 if row_split[5][-1] == "W" else 1),  # Longitude
-                int(row_split[6].lstrip(" ")),  # maximum sustained wind (knots)
-                int(row_split[7].lstrip(" ")),  # minimum central pressure
-                int(row_split[8].lstrip(" ")),  # 34 kt wind radii max extent in N-E quadrant in nautical miles
-                int(row_split[9].lstrip(" ")),  # 34 kt wind radii max extent in S-E quadrant in nautical miles
-                int(row_split[10].lstrip(" ")),  # 34 kt wind radii max extent in S-W quadrant in nautical miles
-                int(row_split[11].lstrip(" ")),  # 34 kt wind radii max extent in N-W quadrant in nautical miles
-                int(row_split[12].lstrip(" ")),  # 50 kt wind radii max extent in N-E quadrant in nautical miles
-                int(row_split[13].lstrip(" ")),  # 50 kt wind radii max extent in S-E quadrant in nautical miles
-                int(row_split[14].lstrip(" ")),  # 50 kt wind radii max extent in S-W quadrant in nautical miles
-                int(row_split[15].lstrip(" ")),  # 50 kt wind radii max extent in N-W quadrant in nautical miles
-                int(row_split[16].lstrip(" ")),  # 64 kt wind radii max extent in N-E quadrant in nautical miles
-                int(row_split[17].lstrip(" ")),  # 64 kt wind radii max extent in S-E quadrant in nautical miles
-                int(row_split[18].lstrip(" ")),  # 64 kt wind radii max extent in S-W quadrant in nautical miles
-                int(row_split[19].lstrip(" ")),  # 64 kt wind radii max extent in N-W quadrant in nautical miles
-            ])
-    file.close()
-    return file_headers, file_data
-
-
-def create_path(df):
-    if df.shape[0] == 1:
-        return "POINT(" + df["point"] + ")"
-    else:
-        return "(" + df["point"] + ", " + df["next_point"] + ")"
+    # header and data rows have a different number of fields, so read whole lines with a delimiter that never appears
+    # and split them afterwards. the file is memory mapped so the reader parses straight from the page cache.
+    with pa.memory_map(file_path) as source:
+        lines = pcsv.read_csv(
+            source,
+            read_options=pcsv.ReadOptions(column_names=["row"]),
+            parse_options=pcsv.ParseOptions(delimiter="\x1f", quote_char=False),
+            convert_options=pcsv.ConvertOptions(column_types={"row": pa.string()})
+        )["row"]
+    # data rows start with their date while header rows start with the basin, so only split each type of row as far as
+    # it needs. header rows only have 3 fields before the trailing comma.
+    is_data = pc.utf8_is_digit(pc.utf8_slice_codeunits(lines, 0, 1))
+    is_header = pc.invert(is_data)
+    headers = pc.split_pattern(lines.filter(is_header), ",", max_splits=3)
+    event_id = field(headers, 0)
+    file_headers = pa.table({
+        "event_id": event_id,
+        "basin": pc.utf8_slice_codeunits(event_id, 0, 2),
+        "storm_num": pc.utf8_slice_codeunits(event_id, 2, 4),
+        "year": pc.utf8_slice_codeunits(event_id, 4, 8),
+        # names are only left trimmed, some like "LI " keep their trailing space
+        "name": pc.utf8_ltrim(pc.list_element(headers, 1), " "),
+        "num_points": pc.cast(field(headers, 2), pa.int16())
+    })
+    # event id, the first 8 characters of the header rows. Need this to link back to header table.
+    event_id = pc.fill_null_forward(
+        pc.if_else(is_header, pc.utf8_slice_codeunits(lines, 0, 8), pa.scalar(None, pa.string()))
+    )
+    data = pc.split_pattern(lines.filter(is_data), ",")
+    date = field(data, 0)
+    time = field(data, 1)
+    file_data = pa.table({
+        "event_id": event_id.filter(is_data),
+        "year": pc.cast(pc.utf8_slice_codeunits(date, 0, 4), pa.int16()),
+        "month": pc.cast(pc.utf8_slice_codeunits(date, 4, 6), pa.int8()),
+        "day": pc.cast(pc.utf8_slice_codeunits(date, 6, 8), pa.int8()),
+        "hours_UTC": pc.cast(pc.utf8_slice_codeunits(time, 0, 2), pa.int8()),
+        "minutes_UTC": pc.cast(pc.utf8_slice_codeunits(time, 2, 4), pa.int8()),
+        "identifier": pc.dictionary_encode(field(data, 2)),
+        "status": pc.dictionary_encode(field(data, 3)),
+        "latitude": coordinate(field(data, 4), "S"),
+        "longitude": coordinate(field(data, 5), "W"),
+        **{column: pc.cast(field(data, index), pa.int16()) for index, column in enumerate(file_columns[6:], 6)}
+    })
+    return file_headers.to_pandas(types_mapper=arrow_types.get), file_data.to_pandas(types_mapper=arrow_types.get)
+
+
+def encode(column, codes):
+    """ Maps a column of codes to their integer values through a categorical, unknown codes become missing. The column
+    is always recoded to the dictionary's category order, whatever order its own categories are in.
+
+    >>> file_order = ["HU", "TS", "TD", "EX", "SD", "SS", "LO", "WV", "DB"]
+    >>> encode(pd.Series(pd.Categorical(["HU", "TS", "TD"], categories=file_order)), status).tolist()
+    [2, 1, 0]
+    """
+    dtype = code_dtype(codes)
+    values = np.array([codes[code] for code in dtype.categories], dtype="int8")
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype("category")
+    # set_categories recodes by value. astype(dtype) would keep the codes whenever the category sets match because
+    # unordered categorical dtypes ignore order when compared.
+    category = column.cat.set_categories(dtype.categories).cat.codes.to_numpy()
+    return pd.Series(values[category], index=column.index, dtype="Int8").mask(category == -1)
+
+
+def path_wkb(path):
+    """ Builds the well-known binary geometry of each event's path from its segments. Events with a single point are a
+    POINT and all others a MULTILINESTRING of two point segments."""
+    # hurdat2 positions are recorded to a tenth of a degree so rounding recovers them exactly from float32
+    coordinates = path[["longitude", "latitude", "next_longitude", "next_latitude"]].to_numpy("float64").round(1)
+    points = np.zeros(len(path), dtype=[("byte_order", "u1"), ("type", "<u4"), ("coordinates", "<f8", 2)])
+    points["byte_order"] = 1  # little endian
+    points["type"] = 1
+    points["coordinates"] = coordinates[:, :2]
+    lines = np.zeros(
+        len(path),
+        dtype=[("byte_order", "u1"), ("type", "<u4"), ("num_points", "<u4"), ("coordinates", "<f8", 4)]
+    )
+    lines["byte_order"] = 1
+    lines["type"] = 2
+    lines["num_points"] = 2
+    lines["coordinates"] = coordinates
+    point_bytes = points.tobytes()
+    line_bytes = lines.tobytes()
+    # segments of an event are contiguous
+    event_id = path["event_id"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, event_id[1:] != event_id[:-1]])
+    ends = np.r_[starts[1:], len(path)]
+    single_point = path["single_point"].to_numpy()
+    wkb = [
+        point_bytes[start * points.itemsize:end * points.itemsize] if single_point[start]
+        else struct.pack("<BII", 1, 5, end - start) + line_bytes[start * lines.itemsize:end * lines.itemsize]
+        for start, end in zip(starts, ends)
+    ]
+    return pd.Series(wkb, index=path["event_id"].iloc[starts], name="path_wkb")
 
 
 def clean_data(events, points):
     """function for cleansing the data"""
-    events = pd.DataFrame(
-        events,
-        columns=[
-            "event_id",
-            "basin",
-            "storm_num",
-            "year",
-            "name",
-            "num_points"
-        ]
+    # create time and geography text to process into geography objects in sql server. the coordinates are float32 so
+    # they are formatted with str, the shortest repr like -94.8, as format() would widen them to float first.
+    longitude = points["longitude"].to_numpy()
+    latitude = points["latitude"].to_numpy()
+    points["location"] = np.fromiter(
+        (
+            f"POINT({x!s} {y!s} {'NULL' if wind == -99 else wind} {'NULL' if pressure == -999 else pressure})"
+            for x, y, wind, pressure in zip(
+                longitude, latitude, points["max_wind_knots"].to_numpy(), points["min_pressure_mb"].to_numpy()
+            )
+        ),
+        dtype=object,
+        count=len(points)
     )
-    points = pd.DataFrame(
-        points,
-        columns=[
-            "event_id",
-            "year",
-            "month",
-            "day",
-            "hours_UTC",
-            "minutes_UTC",
-            "identifier",
-            "status",
-            "latitude",
-            "longitude",
-            "max_wind_knots",
-            "min_pressure_mb",
-            "ne_34kt_radii_max_nm",
-            "se_34kt_radii_max_nm",
-            "sw_34kt_radii_max_nm",
-            "nw_34kt_radii_max_nm",
-            "ne_50kt_radii_max_nm",
-            "se_50kt_radii_max_nm",
-            "sw_50kt_radii_max_nm",
-            "nw_50kt_radii_max_nm",
-            "ne_64kt_radii_max_nm",
-            "se_64kt_radii_max_nm",
-            "sw_64kt_radii_max_nm",
-            "nw_64kt_radii_max_nm"
-        ]
+    points["point_time"] = pd.to_datetime(
+        pd.DataFrame({
+            "year": points["year"].astype(int),
+            "month": points["month"].astype(int),
+            "day": points["day"].astype(int),
+            "hour": points["hours_UTC"].astype(int),
+            "minute": points["minutes_UTC"].astype(int)
+        }),
+        utc=True
     )
-    # create time and geography text to process into geography objects in sql server.
-    points["location"] = "POINT(" + points["longitude"].astype(str) + " " + points["latitude"].astype(str) + " " \
-                         + points["max_wind_knots"].astype(str).replace("-99", "NULL") + " " \
-                         + points["min_pressure_mb"].astype(str).replace("-999", "NULL") + ")"
-    points["point_time"] = points["year"] + "-" + points["month"] + "-" + points["day"] + "T" \
-        + points["hours_UTC"] + ":" + points["minutes_UTC"] + ":00.000Z"
-    points["point_time"] = points["point_time"].apply(isoparse)
-    points["point"] = points["longitude"].astype(str) + " " + points["latitude"].astype(str)
-    points.drop(
-        ["year", "month", "day", "hours_UTC", "minutes_UTC", "latitude", "longitude"],
-        axis=1,
-        inplace=True
-    )
-    # clean up values
-    points.replace(
-        {
-            "identifier": record_identifier,
-            "status": status,
-            "max_wind_knots": {-99: pd.NA},
-            "min_pressure_mb": {-999: pd.NA},
-            "ne_34kt_radii_max_nm": {-999: pd.NA},
-            "se_34kt_radii_max_nm": {-999: pd.NA},
-            "sw_34kt_radii_max_nm": {-999: pd.NA},
-            "nw_34kt_radii_max_nm": {-999: pd.NA},
-            "ne_50kt_radii_max_nm": {-999: pd.NA},
-            "se_50kt_radii_max_nm": {-999: pd.NA},
-            "sw_50kt_radii_max_nm": {-999: pd.NA},
-            "nw_50kt_radii_max_nm": {-999: pd.NA},
-            "ne_64kt_radii_max_nm": {-999: pd.NA},
-            "se_64kt_radii_max_nm": {-999: pd.NA},
-            "sw_64kt_radii_max_nm": {-999: pd.NA},
-            "nw_64kt_radii_max_nm": {-999: pd.NA}
-        },
-        inplace=True
-    )
-    points["next_point"] = points.groupby("event_id", sort=False)["point"].shift(-1)
+    # clean up values, -99 and -999 mark missing values
+    points["identifier"] = encode(points["identifier"], record_identifier)
+    points["status"] = encode(points["status"], status)
+    points["max_wind_knots"] = points["max_wind_knots"].mask(points["max_wind_knots"].eq(-99))
+    missing = ["min_pressure_mb"] + radii_columns
+    points[missing] = points[missing].mask(points[missing].eq(-999))
     # construct path segments
+    path = pd.DataFrame({
+        "event_id": points["event_id"],
+        "point": np.fromiter((f"{x!s} {y!s}" for x, y in zip(longitude, latitude)), dtype=object, count=len(points)),
+        "longitude": longitude,
+        "latitude": latitude,
+        "point_time": points["point_time"]
+    })
+    path = path.join(
+        path.groupby("event_id", sort=False)[["point", "longitude", "latitude"]].shift(-1).add_prefix("next_")
+    )
     # drop all segments that have the same start and end point
-    path = points[[
-        "event_id",
-        "point",
-        "next_point",
-        "point_time"
-    ]].drop(points[points["point"] == points["next_point"]].index)
+    path = path[path["point"] != path["next_point"]]
     # remove any duplicate segments that have the start/end points reversed
-    path["point_set"] = path[["event_id", "point", "next_point"]].apply(frozenset, axis=1)
-    path = path.drop_duplicates(subset="point_set", keep="first")
-    # group the segments by event for processing
-    grouped = path.groupby("event_id", sort=False)
+    in_order = path["point"] < path["next_point"]
+    path = path.assign(
+        first_point=path["point"].where(in_order, path["next_point"]),
+        last_point=path["next_point"].where(in_order, path["point"])
+    ).drop_duplicates(subset=["event_id", "first_point", "last_point"], keep="first")
     # remove any segments that don't have an end point, like the last point in each event,
-    # but keep events with only one point
-    path_text = grouped.apply(create_path).dropna()
-    events["start_time"] = grouped.first()["point_time"].values
-    events["path"] = path_text.groupby("event_id", sort=False).apply(",".join).values
-    events.loc[events["path"].str[0] == "(", "path"] = "MULTILINESTRING(" \
-        + events.loc[events["path"].str[0] == "(", "path"] + ")"
+    # but keep events with only one point. the segments of an event are contiguous so an event has a single point when
+    # its neighbours both belong to other events.
+    event_id = path["event_id"]
+    path["single_point"] = event_id.ne(event_id.shift(fill_value="")) & event_id.ne(event_id.shift(-1, fill_value=""))
+    path = path[path["single_point"] | path["next_point"].notna()]
+    # group the segments by event for processing
+    events = events.join(path.groupby("event_id", sort=False).agg(start_time=("point_time", "first")), on="event_id")
+    events = events.join(path_wkb(path), on="event_id")
     events.drop(["storm_num", "num_points", "year"], axis=1, inplace=True)
     # remove intermediary calculation columns
-    points.drop(["point", "next_point"], axis=1, inplace=True)
+    points.drop(
+        ["year", "month", "day", "hours_UTC", "minutes_UTC", "latitude", "longitude"],
+        axis=1,
+        inplace=True
+    )
     return events, points
 
 
 if __name__ == "__main__":
-    #%% process each basin's HURDAT2 file
-    atlantic_headers, atlantic_data = process_file(atlantic_path)
-    pacific_headers, pacific_data = process_file(pacific_path)
-
-    #%% clean data
-    atlantic_headers, atlantic_data = clean_data(atlantic_headers, atlantic_data)
-    pacific_headers, pacific_data = clean_data(pacific_headers, pacific_data)
+    #%% process and clean each basin's HURDAT2 file in parallel
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        atlantic = executor.submit(lambda: clean_data(*process_file(atlantic_path)))
+        pacific = executor.submit(lambda: clean_data(*process_file(pacific_path)))
+        atlantic_headers, atlantic_data = atlantic.result()
+        pacific_headers, pacific_data = pacific.result()
 
     #%% combined the dataframes
     headers = pd.concat([atlantic_headers, pacific_headers])
@@ -228,95 +327,112 @@ if __name__ == "__main__":
     conn = engine.connect()
     table_types = {
         "event_id": sal.types.NCHAR(length=8),
-        "identifier": sal.types.INTEGER(),
-        "status": sal.types.INTEGER(),
-        "max_wind_knots": sal.types.INTEGER(),
-        "min_pressure_mb": sal.types.INTEGER(),
-        "ne_34kt_radii_max_nm": sal.types.INTEGER(),
-        "se_34kt_radii_max_nm": sal.types.INTEGER(),
-        "sw_34kt_radii_max_nm": sal.types.INTEGER(),
-        "nw_34kt_radii_max_nm": sal.types.INTEGER(),
-        "ne_50kt_radii_max_nm": sal.types.INTEGER(),
-        "se_50kt_radii_max_nm": sal.types.INTEGER(),
-        "sw_50kt_radii_max_nm": sal.types.INTEGER(),
-        "nw_50kt_radii_max_nm": sal.types.INTEGER(),
-        "ne_64kt_radii_max_nm": sal.types.INTEGER(),
-        "se_64kt_radii_max_nm": sal.types.INTEGER(),
-        "sw_64kt_radii_max_nm": sal.types.INTEGER(),
-        "nw_64kt_radii_max_nm": sal.types.INTEGER(),
+        "identifier": sal.types.TINYINT(),
+        "status": sal.types.TINYINT(),
+        "max_wind_knots": sal.types.SMALLINT(),
+        "min_pressure_mb": sal.types.SMALLINT(),
+        "ne_34kt_radii_max_nm": sal.types.SMALLINT(),
+        "se_34kt_radii_max_nm": sal.types.SMALLINT(),
+        "sw_34kt_radii_max_nm": sal.types.SMALLINT(),
+        "nw_34kt_radii_max_nm": sal.types.SMALLINT(),
+        "ne_50kt_radii_max_nm": sal.types.SMALLINT(),
+        "se_50kt_radii_max_nm": sal.types.SMALLINT(),
+        "sw_50kt_radii_max_nm": sal.types.SMALLINT(),
+        "nw_50kt_radii_max_nm": sal.types.SMALLINT(),
+        "ne_64kt_radii_max_nm": sal.types.SMALLINT(),
+        "se_64kt_radii_max_nm": sal.types.SMALLINT(),
+        "sw_64kt_radii_max_nm": sal.types.SMALLINT(),
+        "nw_64kt_radii_max_nm": sal.types.SMALLINT(),
         "location": sal.types.NVARCHAR(length=100),
         "point_time": sal.DateTime()
     }
-    data.to_sql("Historical_HU_points", con=engine, if_exists="replace", dtype=table_types, index=False)
+    if bulk_insert_file is None:
+        # fast_executemany binds whole arrays of parameters per round trip, so batches are only limited by the memory of
+        # the bind buffers. method="multi" would be capped at 2100 parameters, about 110 rows, per statement.
+        data.to_sql(
+            "Historical_HU_points",
+            con=engine,
+            if_exists="replace",
+            dtype=table_types,
+            index=False,
+            chunksize=10000
+        )
+    else:
+        # create the empty table with the right types, then let sql server load the rows itself
+        data.head(0).to_sql("Historical_HU_points", con=engine, if_exists="replace", dtype=table_types, index=False)
+        # write bare line feeds on every client os. BULK INSERT's default row terminator means a carriage return and
+        # line feed, so it is given the line feed explicitly.
+        data.to_csv(
+            bulk_insert_file,
+            sep="\t",
+            na_rep="",
+            index=False,
+            date_format="%Y-%m-%dT%H:%M:%S",
+            lineterminator="\n"
+        )
+        sql = (
+            "BULK INSERT Historical_HU_points FROM '" + bulk_insert_file.replace("'", "''") + "' "
+            "WITH (FIRSTROW = 2, FIELDTERMINATOR = '\\t', ROWTERMINATOR = '0x0a', KEEPNULLS, TABLOCK);"
+        )
+        conn.execute(sal.text(sql).execution_options(autocommit=True))
     table_types = {
         "event_id": sal.types.NCHAR(length=8),
         "basin": sal.types.NVARCHAR(length=2),
         "name": sal.types.NVARCHAR(length=40),
         "start_time": sal.DateTime(),
-        "path": sal.types.NVARCHAR()
+        "path_wkb": sal.types.VARBINARY()
     }
     headers.to_sql("Historical_HU", con=engine, if_exists="replace", dtype=table_types, index=False)
 
-    record = pd.DataFrame.from_dict(record_identifier, orient="index").reset_index()[:-1]
-    record.columns = ["description", "record_id"]
-    record["description"] = [
-        "closest approach to a coast, not followed by a landfall",
-        "genesis",
-        "an intensity peak in terms of both pressure and wind",
-        "landfall",
-        "minimum central pressure",
-        "additional detail on intensity of cyclone when rapid changes are underway",
-        "change in status of the system",
-        "provides additional detail on the track (position) of the cyclone",
-        "maximum sustained wind speed"
-    ]
-    record.to_sql("HU_points_identifier", con=engine, if_exists="replace",
-                  dtype={"record_id": sal.types.INTEGER(), "description": sal.types.NVARCHAR(length=100)}, index=False)
-
-    df_status = pd.DataFrame.from_dict(status, orient="index").reset_index()[:-5]
-    df_status.columns = ["description", "status_id"]
-    df_status["description"] = [
-        "tropical cyclone of tropical depression intensity (<34 knots)",
-        "tropical cyclone of tropical storm intensity (34-63 knots)",
-        "tropical cyclone of hurricane intensity (>= 64 knots)",
-        "extratropical cyclone of any intensity",
-        "subtropical cyclone of subtropical depression intensity (<34 knots)",
-        "subtropical cyclone of subtropical storm intensity (>= 34 knots)",
-        "low that is neither a tropical cyclone, a subtropical cyclone, nor an extratropical cyclone",
-        "a tropical wave",
-        "disturbance of any intensity",
-    ]
-    df_status.to_sql("HU_points_status", con=engine, if_exists="replace",
-                     dtype={"status_id": sal.types.INTEGER(), "description": sal.types.NVARCHAR(length=100)}, index=False)
-    #%% create keys, indexes, and geo datatypes
-    sql = (
-        "ALTER TABLE Historical_HU ALTER COLUMN event_id nchar(8) NOT NULL; "
-        "ALTER TABLE Historical_HU_points ADD point_id int NOT NULL IDENTITY;"
-        "ALTER TABLE HU_points_identifier ALTER COLUMN record_id int NOT NULL;"
-        "ALTER TABLE HU_points_status ALTER COLUMN status_id int NOT NULL;"
+    record_table.to_sql(
+        "HU_points_identifier",
+        con=engine,
+        if_exists="replace",
+        dtype={"record_id": sal.types.TINYINT(), "description": sal.types.NVARCHAR(length=100)},
+        index=False
     )
-    conn.execute(sql)
-    sql = (
-        "ALTER TABLE Historical_HU "
-        "ADD CONSTRAINT PK_Historical_HU_event_id PRIMARY KEY CLUSTERED (event_id), path_geo geography;"
-        "ALTER TABLE HU_points_identifier "
-        "ADD CONSTRAINT PK_points_identifier PRIMARY KEY (record_id);"
-        "ALTER TABLE HU_points_status "
-        "ADD CONSTRAINT PK_points_status PRIMARY KEY (status_id);"
-        "ALTER TABLE Historical_HU_points "
-        "ADD CONSTRAINT PK_Historical_HU_point_id PRIMARY KEY CLUSTERED (point_id), "
-        "FOREIGN KEY (event_id) REFERENCES Historical_HU(event_id), "
-        "FOREIGN KEY (identifier) REFERENCES HU_points_identifier(record_id),"
-        "FOREIGN KEY (status) REFERENCES HU_points_status(status_id), location_geo geography;"
-    )
-    conn.execute(sql)
-    sql = (
-        "UPDATE Historical_HU SET path_geo = geography::STGeomFromText(path, 4326);"
-        "CREATE SPATIAL INDEX Historical_HU_path ON Historical_HU (path_geo) USING GEOGRAPHY_AUTO_GRID;"
-        "UPDATE Historical_HU_points SET location_geo = geography::STGeomFromText(location, 4326);"
-        "CREATE SPATIAL INDEX Historical_HU_point on Historical_HU_points (location_geo) USING GEOGRAPHY_AUTO_GRID;"
+
+    status_table.to_sql(
+        "HU_points_status",
+        con=engine,
+        if_exists="replace",
+        dtype={"status_id": sal.types.TINYINT(), "description": sal.types.NVARCHAR(length=100)},
+        index=False
     )
-    conn.execute(sql)
+    #%% create keys, persisted geography columns computed from the WKB and WKT, and indexes in a single transaction.
+    # the batches are sent separately as columns added in one batch can't be referenced until the next.
+    with conn.begin():
+        sql = (
+            "SET XACT_ABORT ON; "
+            "ALTER TABLE Historical_HU ALTER COLUMN event_id nchar(8) NOT NULL; "
+            "ALTER TABLE Historical_HU_points ADD point_id int NOT NULL IDENTITY;"
+            "ALTER TABLE HU_points_identifier ALTER COLUMN record_id tinyint NOT NULL;"
+            "ALTER TABLE HU_points_status ALTER COLUMN status_id tinyint NOT NULL;"
+        )
+        conn.execute(sql)
+        sql = (
+            "ALTER TABLE Historical_HU "
+            "ADD CONSTRAINT PK_Historical_HU_event_id PRIMARY KEY CLUSTERED (event_id), "
+            "path_geo AS geography::STGeomFromWKB(path_wkb, 4326) PERSISTED;"
+            "ALTER TABLE HU_points_identifier "
+            "ADD CONSTRAINT PK_points_identifier PRIMARY KEY (record_id);"
+            "ALTER TABLE HU_points_status "
+            "ADD CONSTRAINT PK_points_status PRIMARY KEY (status_id);"
+            "ALTER TABLE Historical_HU_points "
+            "ADD CONSTRAINT PK_Historical_HU_point_id PRIMARY KEY CLUSTERED (point_id), "
+            "FOREIGN KEY (event_id) REFERENCES Historical_HU(event_id), "
+            "FOREIGN KEY (identifier) REFERENCES HU_points_identifier(record_id),"
+            "FOREIGN KEY (status) REFERENCES HU_points_status(status_id), "
+            "location_geo AS geography::STGeomFromText(location, 4326) PERSISTED;"
+        )
+        conn.execute(sql)
+        sql = (
+            "CREATE SPATIAL INDEX Historical_HU_path ON Historical_HU (path_geo) USING GEOGRAPHY_AUTO_GRID "
+            "WITH (MAXDOP = 0, SORT_IN_TEMPDB = ON);"
+            "CREATE SPATIAL INDEX Historical_HU_point on Historical_HU_points (location_geo) USING GEOGRAPHY_AUTO_GRID "
+            "WITH (MAXDOP = 0, SORT_IN_TEMPDB = ON);"
+        )
+        conn.execute(sql)
     conn.close()
 
 